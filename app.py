@@ -3,7 +3,9 @@ import sys
 import json
 import time
 import threading
+import gc
 import ctypes
+import hashlib
 from datetime import datetime
 from io import BytesIO
 
@@ -18,6 +20,8 @@ import pystray
 from pystray import MenuItem as item
 # 用于图片复制到剪贴板
 import win32clipboard 
+import win32api
+import win32process
 
 # OCR & AI
 # 【修改】使用通用性更好的 onnxruntime
@@ -66,6 +70,11 @@ class LogManager:
         sys.stdout = open(os.path.join(LogManager.DIR, f"log_{timestamp}.log"), "w", encoding="utf-8", buffering=1)
         sys.stderr = sys.stdout
 
+def get_rss_mb():
+    # 当前进程常驻内存 (Working Set)，取不到时返回 0
+    try: return win32process.GetProcessMemoryInfo(win32api.GetCurrentProcess())["WorkingSetSize"] / 1048576
+    except Exception: return 0.0
+
 class HistoryManager:
     DIR = "records"
     @staticmethod
@@ -94,8 +103,15 @@ class Config:
         "hotkey_clip": "ctrl+f1",
         "enable_hotkeys": True,
         "enable_logging": False,
-        "enable_history": True
+        "enable_history": True,
+        "idle_unload_min": 10,
+        "memory_budget_mb": 0
     }
+    INT_KEYS = ("idle_unload_min", "memory_budget_mb")
+    @staticmethod
+    def to_int(val, default):
+        try: return max(0, int(val))
+        except (TypeError, ValueError): return default
     @staticmethod
     def load():
         if not os.path.exists(Config.SCREENSHOT_DIR): os.makedirs(Config.SCREENSHOT_DIR)
@@ -107,6 +123,8 @@ class Config:
                 data = json.load(f)
                 for k, v in Config.DEFAULT.items():
                     if k not in data: data[k] = v
+                # 手改的配置可能写成字符串
+                for k in Config.INT_KEYS: data[k] = Config.to_int(data[k], Config.DEFAULT[k])
                 return data
         except: return Config.DEFAULT.copy()
     @staticmethod
@@ -145,8 +163,13 @@ class PinWindow(ctk.CTkToplevel):
         self.menu.add_separator()
         self.menu.add_command(label="❌ 关闭", command=self.destroy)
         
+        with self.app.pins_lock: self.app.pins.add(self)
         self.focus_force()
 
+    def destroy(self):
+        with self.app.pins_lock: self.app.pins.discard(self)
+        super().destroy()
+
     def start_move(self, event):
         self.x = event.x
         self.y = event.y
@@ -157,15 +180,20 @@ class PinWindow(ctk.CTkToplevel):
         self.geometry(f"+{x}+{y}")
 
     def show_context_menu(self, event):
+        self.app.engine.prewarm()
         self.menu.post(event.x_root, event.y_root)
 
     def do_save(self):
-        ts = datetime.now().strftime("%Y%m%d_%H%M%S")
-        path = os.path.join(Config.SCREENSHOT_DIR, f"{ts}.png")
+        threading.Thread(target=self._save_thread, args=(self.image,), daemon=True).start()
+
+    def _save_thread(self, image):
         try:
-            self.image.save(path)
-            self.app.show_status_toast(f"已保存: {ts}.png", COLOR_GREEN)
-        except: self.app.show_status_toast("保存失败", COLOR_RED)
+            rec, is_new = self.app.store.add(image, "pin")
+            if is_new: self.app.after(0, lambda: self.app.show_status_toast(f"已保存: {rec['ts']}", COLOR_GREEN))
+            else: self.app.after(0, lambda: self.app.show_status_toast("已存在相同截图", COLOR_BLUE))
+        except Exception as e:
+            print(f"保存失败: {e}")
+            self.app.after(0, lambda: self.app.show_status_toast("保存失败", COLOR_RED))
 
     def do_ocr(self):
         self.app.show_status_toast("正在从贴图识别...", "white")
@@ -348,26 +376,406 @@ class SnippingTool(ctk.CTkToplevel):
         self.destroy()
         self.app.deiconify()
 
+# ---------------------------------------------------------
+# 4. 截图仓库 (像素哈希去重 + 缩略图图集)
+# ---------------------------------------------------------
+class CaptureStore:
+    """printscreen/ 下按像素哈希寻址的截图库。
+    store/xx/<hash>.png 存原图，index.jsonl 存索引 (逐行追加，同一哈希后写覆盖先写)，
+    atlas/atlas_NNNN.png 存缩略图图集。列表与过滤只查内存索引，不打开原图。"""
+    THUMB = 128
+    ATLAS_COLS = 16
+    TS_FMT = "%Y%m%d_%H%M%S"
+    FLUSH_DELAY = 2.0
+    RECENT_TEXT = 50
+
+    def __init__(self, root):
+        self.root = root
+        self.obj_dir = os.path.join(root, "store")
+        self.atlas_dir = os.path.join(root, "atlas")
+        self.index_file = os.path.join(root, "index.jsonl")
+        self.mark_file = os.path.join(self.atlas_dir, "flushed.json")
+        self.lock = threading.RLock()
+        self.records = {}
+        self.next_slot = 0
+        self._pages = {}      # 内存中的图集页：最近一页 + 尚未写盘或正在写盘的页
+        self._dirty = set()
+        self._flushing = set()
+        self._flush_lock = threading.Lock()
+        self._flush_timer = None
+        self._recent_text = {} # 最近的 OCR 结果，先识别后保存时也能挂上
+        self._repair = set()   # 待从原图重建缩略图的槽位
+        for d in (self.obj_dir, self.atlas_dir):
+            if not os.path.exists(d): os.makedirs(d)
+        self._load_index()
+        if self._repair: threading.Thread(target=self._rebuild_thumbs, daemon=True).start()
+
+    @staticmethod
+    def pixel_hash(img):
+        # 只对像素取哈希，同一区域重复保存也只算一张；模式和透明通道也算在内，不做转换
+        h = hashlib.sha1(f"{img.mode}{img.size}".encode())
+        h.update(img.tobytes())
+        return h.hexdigest()
+
+    def _obj_path(self, digest):
+        return os.path.join(self.obj_dir, digest[:2], f"{digest}.png")
+
+    def path(self, rec):
+        return self._obj_path(rec["hash"])
+
+    def _page_path(self, page_no):
+        return os.path.join(self.atlas_dir, f"atlas_{page_no:04d}.png")
+
+    def _load_index(self):
+        if not os.path.exists(self.index_file): return
+        lines = 0
+        with open(self.index_file, "r", encoding="utf-8") as f:
+            for line in f:
+                try: rec = json.loads(line)
+                except: continue
+                self.records[rec["hash"]] = rec
+                lines += 1
+        if self.records:
+            self.next_slot = max(r["slot"] for r in self.records.values()) + 1
+        # flushed.json 记录已写盘的槽位上限，之后的缩略图是上次异常退出前没写盘的
+        try:
+            with open(self.mark_file, "r", encoding="utf-8") as f: flushed = int(json.load(f)["slots"])
+        except Exception: flushed = 0
+        self._repair = {r["slot"] for r in self.records.values() if r["slot"] >= flushed}
+        # 覆盖写入太多时重写一遍索引
+        if lines > 2 * len(self.records) + 100: self._compact()
+
+    def _compact(self):
+        tmp = self.index_file + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            for rec in self.records.values():
+                f.write(json.dumps(rec, ensure_ascii=False) + "\n")
+        os.replace(tmp, self.index_file)
+
+    def _append(self, rec):
+        with open(self.index_file, "a", encoding="utf-8") as f:
+            f.write(json.dumps(rec, ensure_ascii=False) + "\n")
+
+    def _page(self, page_no, create=False):
+        page = self._pages.get(page_no)
+        if page is not None: return page
+        path = self._page_path(page_no)
+        if os.path.exists(path):
+            with Image.open(path) as f: page = f.convert("RGB")
+        elif create:
+            size = self.THUMB * self.ATLAS_COLS
+            page = Image.new("RGB", (size, size), COLOR_BG)
+        else: return None
+        self._pages = self._pinned_pages()
+        self._pages[page_no] = page
+        return page
+
+    def _cell(self, slot):
+        page_no, cell = divmod(slot, self.ATLAS_COLS ** 2)
+        x = (cell % self.ATLAS_COLS) * self.THUMB
+        y = (cell // self.ATLAS_COLS) * self.THUMB
+        return page_no, x, y
+
+    def _pinned_pages(self):
+        # 未写盘或正在写盘的页不能丢，否则下次会读回旧文件覆盖新内容
+        keep = self._dirty | self._flushing
+        return {n: p for n, p in self._pages.items() if n in keep}
+
+    def _put_thumb(self, thumb, slot):
+        # 只贴进内存页，由 flush 统一写盘
+        page_no, x, y = self._cell(slot)
+        self._page(page_no, create=True).paste(thumb, (x, y))
+        self._dirty.add(page_no)
+
+    def _schedule_flush(self):
+        with self.lock:
+            if self._flush_timer: return
+            self._flush_timer = threading.Timer(self.FLUSH_DELAY, self.flush)
+            self._flush_timer.daemon = True
+            self._flush_timer.start()
+
+    def flush(self):
+        """把改动过的图集页写盘。PNG 编码在锁外进行，不阻塞 add。"""
+        with self._flush_lock:
+            with self.lock:
+                self._flush_timer = None
+                pages = {n: self._pages[n].copy() for n in self._dirty}
+                mark = min(self._repair, default=self.next_slot)
+                self._flushing |= self._dirty
+                self._dirty.clear()
+            try:
+                for page_no, page in pages.items():
+                    path = self._page_path(page_no)
+                    page.save(path + ".tmp", "PNG")
+                    os.replace(path + ".tmp", path)
+                with open(self.mark_file + ".tmp", "w", encoding="utf-8") as f: json.dump({"slots": mark}, f)
+                os.replace(self.mark_file + ".tmp", self.mark_file)
+            except Exception:
+                # 写盘失败则重新标脏，等下次再写
+                with self.lock: self._dirty |= set(pages)
+                raise
+            finally:
+                with self.lock: self._flushing -= set(pages)
+
+    def _rebuild_thumbs(self):
+        with self.lock:
+            recs = sorted((r for r in self.records.values() if r["slot"] in self._repair), key=lambda r: r["slot"])
+        for rec in recs:
+            try:
+                with Image.open(self.path(rec)) as f: thumb = f.convert("RGB")
+                thumb.thumbnail((self.THUMB, self.THUMB))
+                with self.lock: self._put_thumb(thumb, rec["slot"])
+            except Exception as e: print(f"Thumb Rebuild Failed {rec['hash']}: {e}")
+            with self.lock: self._repair.discard(rec["slot"])
+        self.flush()
+        print(f"Rebuilt {len(recs)} thumbnails")
+
+    def add(self, img, source, ts=None):
+        """存入截图，返回 (记录, 是否新增)。像素相同的截图只保存一份。"""
+        digest = self.pixel_hash(img)
+        with self.lock:
+            rec = self.records.get(digest)
+            if rec: return rec, False
+        # 原图与缩略图的编码都在锁外完成
+        path = self._obj_path(digest)
+        if not os.path.exists(os.path.dirname(path)): os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{threading.get_ident()}.tmp"
+        img.save(tmp, "PNG")
+        os.replace(tmp, path)
+        thumb = img.convert("RGB")
+        thumb.thumbnail((self.THUMB, self.THUMB))
+        with self.lock:
+            rec = self.records.get(digest)
+            if rec: return rec, False
+            rec = {"hash": digest, "w": img.width, "h": img.height,
+                   "ts": ts or datetime.now().strftime(self.TS_FMT),
+                   "source": source, "text": self._recent_text.get(digest, ""), "slot": self.next_slot,
+                   "tw": thumb.width, "th": thumb.height}
+            self._put_thumb(thumb, rec["slot"])
+            self.next_slot += 1
+            self.records[digest] = rec
+            self._append(rec)
+        self._schedule_flush()
+        return rec, True
+
+    def link_text(self, img, text):
+        """把 OCR 结果挂到同一张截图上；尚未入库的先记下，之后 add 时带上。"""
+        digest = self.pixel_hash(img)
+        with self.lock:
+            self._recent_text.pop(digest, None)
+            self._recent_text[digest] = text
+            if len(self._recent_text) > self.RECENT_TEXT:
+                self._recent_text.pop(next(iter(self._recent_text)))
+            rec = self.records.get(digest)
+            if not rec or rec["text"] == text: return False
+            rec["text"] = text
+            self._append(rec)
+            return True
+
+    def thumbnail(self, rec):
+        with self.lock:
+            page_no, x, y = self._cell(rec["slot"])
+            page = self._page(page_no)
+            if page is None: return None
+            return page.crop((x, y, x + rec["tw"], y + rec["th"]))
+
+    def drop_cache(self):
+        with self.lock: self._pages = self._pinned_pages()
+
+    def cache_mb(self):
+        with self.lock: return sum(p.width * p.height * 3 for p in self._pages.values()) / 1048576
+
+    def query(self, since=None, until=None, source=None, text=None, min_w=0, min_h=0, limit=None):
+        """过滤索引，新的在前。since/until 为 TS_FMT 格式，可只写前缀，如 "20240501"。"""
+        text = text.lower() if text else None
+        with self.lock: recs = list(self.records.values())
+        out = []
+        for r in sorted(recs, key=lambda r: r["ts"], reverse=True):
+            if since and r["ts"] < since: continue
+            if until and r["ts"][:len(until)] > until: continue
+            if source and r["source"] != source: continue
+            if r["w"] < min_w or r["h"] < min_h: continue
+            if text and text not in r["text"].lower(): continue
+            out.append(r)
+            if limit and len(out) >= limit: break
+        return out
+
+    def legacy_files(self):
+        import glob
+        return sorted(glob.glob(os.path.join(self.root, "*.png")))
+
+    def migrate(self):
+        """把 printscreen/ 根目录下旧的时间戳 PNG 导入仓库。
+        原文件不删除，移到 printscreen/imported/ 下，仍可手动浏览。返回 (新增数, 重复数)。"""
+        done_dir = os.path.join(self.root, "imported")
+        if not os.path.exists(done_dir): os.makedirs(done_dir)
+        added = dupes = 0
+        for path in self.legacy_files():
+            stem = os.path.splitext(os.path.basename(path))[0]
+            try: ts = datetime.strptime(stem[:15], self.TS_FMT).strftime(self.TS_FMT)
+            except ValueError: ts = datetime.fromtimestamp(os.path.getmtime(path)).strftime(self.TS_FMT)
+            try:
+                with Image.open(path) as img:
+                    img.load()
+                    _, is_new = self.add(img, "legacy", ts)
+                os.replace(path, os.path.join(done_dir, os.path.basename(path)))
+                if is_new: added += 1
+                else: dupes += 1
+            except Exception as e: print(f"Migrate Failed {path}: {e}")
+        self.flush()
+        if added or dupes: print(f"Migrated {added} screenshots into store, {dupes} duplicates skipped")
+        return added, dupes
+
+class HistoryWindow(ctk.CTkToplevel):
+    """截图历史：只读索引和缩略图图集。单击贴出原图，右键复制识别文字。"""
+    COLS = 4
+    LIMIT = 200
+
+    def __init__(self, master_app):
+        super().__init__()
+        self.app = master_app
+        self.store = master_app.store
+        self.title("截图历史")
+        self.geometry("620x560")
+        self.attributes("-topmost", True)
+        self.configure(fg_color=COLOR_BG)
+
+        bar = ctk.CTkFrame(self, fg_color="transparent")
+        bar.pack(fill="x", padx=10, pady=(10, 5))
+        self.e_text = ctk.CTkEntry(bar, placeholder_text="搜索识别文字", font=FONT_MAIN, height=32)
+        self.e_text.pack(side="left", fill="x", expand=True)
+        self.e_date = ctk.CTkEntry(bar, placeholder_text="日期, 如 202405", width=130, font=FONT_MAIN, height=32)
+        self.e_date.pack(side="left", padx=5)
+        for e in (self.e_text, self.e_date): e.bind("<Return>", lambda ev: self.refresh())
+        ctk.CTkButton(bar, text="筛选", width=60, height=32, font=FONT_BOLD,
+                      fg_color=COLOR_BLUE, hover_color="#0056b3", command=self.refresh).pack(side="left")
+
+        self.grid_frame = ctk.CTkScrollableFrame(self, fg_color="#2c2c2e", corner_radius=10)
+        self.grid_frame.pack(fill="both", expand=True, padx=10, pady=5)
+
+        foot = ctk.CTkFrame(self, fg_color="transparent")
+        foot.pack(fill="x", padx=10, pady=(5, 10))
+        self.lbl_count = ctk.CTkLabel(foot, text="", font=FONT_SMALL, text_color="gray")
+        self.lbl_count.pack(side="left")
+        # 旧截图需用户手动导入
+        legacy = self.store.legacy_files()
+        self.btn_import = ctk.CTkButton(foot, text=f"导入旧截图 ({len(legacy)})", height=28, font=FONT_SMALL,
+                                        fg_color="#3a3a3c", hover_color="#48484a", command=self.do_import)
+        if legacy: self.btn_import.pack(side="right")
+
+        self.thumbs = [] # 保持引用防止被GC回收
+        self.refresh()
+        self.focus_force()
+
+    def refresh(self):
+        for w in self.grid_frame.winfo_children(): w.destroy()
+        date = self.e_date.get().strip() or None
+        recs = self.store.query(since=date, until=date, text=self.e_text.get().strip() or None)
+        hint = f"，显示最近 {self.LIMIT} 张" if len(recs) > self.LIMIT else ""
+        self.lbl_count.configure(text=f"共 {len(recs)} 张{hint}")
+        self.thumbs = []
+        for i, rec in enumerate(recs[:self.LIMIT]):
+            thumb = self.store.thumbnail(rec)
+            if thumb is None: continue
+            img = ctk.CTkImage(thumb, size=thumb.size)
+            self.thumbs.append(img)
+            ts = rec["ts"]
+            cell = ctk.CTkLabel(self.grid_frame, text=f"{ts[:4]}-{ts[4:6]}-{ts[6:8]} {ts[9:11]}:{ts[11:13]}",
+                                image=img, compound="top", font=FONT_SMALL, text_color="gray",
+                                width=self.store.THUMB + 8, height=self.store.THUMB + 24)
+            cell.grid(row=i // self.COLS, column=i % self.COLS, padx=4, pady=4)
+            cell.bind("<Button-1>", lambda e, r=rec: self.open_pin(r))
+            cell.bind("<Button-3>", lambda e, r=rec: self.copy_text(r))
+
+    def open_pin(self, rec):
+        try:
+            with Image.open(self.store.path(rec)) as f: img = f.copy()
+        except Exception as e:
+            print(f"Open Failed: {e}")
+            self.app.show_status_toast("原图丢失", COLOR_RED)
+            return
+        PinWindow(self.app, img)
+
+    def copy_text(self, rec):
+        if not rec["text"]:
+            self.app.show_status_toast("没有识别文字", "gray")
+            return
+        pyperclip.copy(rec["text"])
+        self.app.show_status_toast("文字已复制", COLOR_GREEN)
+
+    def do_import(self):
+        self.btn_import.configure(state="disabled", text="导入中...")
+        threading.Thread(target=self._import_thread, daemon=True).start()
+
+    def _import_thread(self):
+        added, dupes = self.store.migrate()
+        self.app.after(0, lambda: self._import_done(added, dupes))
+
+    def _import_done(self, added, dupes):
+        hint = f"，{dupes} 张重复" if dupes else ""
+        self.app.show_status_toast(f"已导入 {added} 张{hint}", COLOR_GREEN)
+        if not self.winfo_exists(): return
+        self.btn_import.pack_forget()
+        self.refresh()
+
 # ---------------------------------------------------------
 # 5. 核心引擎
 # ---------------------------------------------------------
 class Engine:
     def __init__(self):
+        # OCR 模型按需加载，空闲时由 EngineManager 释放
+        self.ocr = None
+        self.lock = threading.Lock()
+        self.busy = 0
+        self.last_used = time.time()
+
+    def _load_locked(self):
+        t0 = time.perf_counter()
         try: self.ocr = RapidOCR()
         except Exception as e:
             print(f"OCR Init Failed: {e}")
+            return
+        print(f"OCR Loaded in {(time.perf_counter() - t0) * 1000:.0f} ms, RSS {get_rss_mb():.0f} MB")
+
+    def load(self):
+        with self.lock:
+            if not self.ocr: self._load_locked()
+
+    def prewarm(self):
+        # 在截图界面显示期间后台加载，用户框选时模型已就绪
+        self.last_used = time.time()
+        if not self.ocr: threading.Thread(target=self.load, daemon=True).start()
+
+    def unload(self, reason):
+        with self.lock:
+            if not self.ocr or self.busy: return False
+            before = get_rss_mb()
             self.ocr = None
+            gc.collect()
+        print(f"OCR Unloaded ({reason}), RSS {before:.0f} -> {get_rss_mb():.0f} MB")
+        return True
+
+    def idle_seconds(self):
+        return time.time() - self.last_used
 
     def run_ocr(self, img):
-        if not self.ocr: return None
+        with self.lock:
+            if not self.ocr: self._load_locked()
+            ocr = self.ocr
+            if not ocr: return None
+            self.busy += 1
         try:
             img = img.convert("RGB")
             if np.array(img).mean() < 128: img = ImageOps.invert(img)
-            result, _ = self.ocr(np.array(img))
+            result, _ = ocr(np.array(img))
             return "\n".join([line[1] for line in result]) if result else None
         except Exception as e:
             print(f"OCR Error: {e}")
             return None
+        finally:
+            with self.lock:
+                self.busy -= 1
+                self.last_used = time.time()
 
     def run_ai(self, text, cfg):
         if not cfg["api_key"]: return text
@@ -380,6 +788,57 @@ class Engine:
             return resp.choices[0].message.content
         except Exception as e: return f"{text}\n\n[AI Error: {e}]"
 
+class EngineManager:
+    """OCR 模型生命周期：空闲超时后释放会话，并把引擎、图集缓存和贴图的内存控制在预算内。"""
+    CHECK_INTERVAL = 30
+    BUDGET_GRACE = 120   # 刚用过或刚预热的模型，这么多秒内不因预算释放
+    HYSTERESIS = 0.9     # 回落到预算的 90% 以下才算解除超限
+
+    def __init__(self, app):
+        self.app = app
+        self.over_budget = False
+        self.stop_event = threading.Event()
+        threading.Thread(target=self._loop, daemon=True).start()
+
+    def _loop(self):
+        while not self.stop_event.wait(self.CHECK_INTERVAL):
+            try: self.check()
+            except Exception as e: print(f"Lifecycle Error: {e}")
+
+    def check(self):
+        engine = self.app.engine
+        idle_min = self.app.cfg.get("idle_unload_min", 0)
+        if idle_min > 0 and engine.idle_seconds() > idle_min * 60:
+            engine.unload(f"idle {idle_min} min")
+        budget = self.app.cfg.get("memory_budget_mb", 0)
+        if budget > 0: self.enforce(budget)
+
+    def pins_usage(self):
+        # 贴图是用户可见的窗口，只计入不回收：PIL 原图 + Tk 位图各一份
+        # pins 由 Tk 线程增删，这里在锁内取快照
+        with self.app.pins_lock: sizes = [p.image.size for p in self.app.pins]
+        return len(sizes), sum(w * h * 4 * 2 for w, h in sizes) / 1048576
+
+    def enforce(self, budget):
+        rss = get_rss_mb()
+        # 只在状态切换时写日志，避免常驻进程每轮刷屏
+        if not self.over_budget and rss > budget:
+            self.over_budget = True
+            pins, pins_mb = self.pins_usage()
+            print(f"Memory over budget: RSS {rss:.0f}/{budget} MB, "
+                  f"cache {self.app.store.cache_mb():.0f} MB, pins {pins} ({pins_mb:.0f} MB)")
+        elif self.over_budget and rss < budget * self.HYSTERESIS:
+            self.over_budget = False
+            print(f"Memory back under budget: RSS {rss:.0f}/{budget} MB")
+        if not self.over_budget: return
+        # 先丢缓存，仍超出且模型已闲置一段时间再释放模型
+        self.app.store.drop_cache()
+        if get_rss_mb() > budget and self.app.engine.idle_seconds() > self.BUDGET_GRACE:
+            self.app.engine.unload("budget")
+
+    def stop(self):
+        self.stop_event.set()
+
 # ---------------------------------------------------------
 # 6. 主程序
 # ---------------------------------------------------------
@@ -389,6 +848,12 @@ class App(ctk.CTk):
         self.cfg = Config.load()
         LogManager.init(self.cfg["enable_logging"])
         self.engine = Engine()
+        self.pins = set()
+        self.pins_lock = threading.Lock()
+        self.store = CaptureStore(Config.SCREENSHOT_DIR)
+        self.history = None
+        self.engine.prewarm()
+        self.lifecycle = EngineManager(self)
         
         ctk.set_appearance_mode("Dark")
         ctk.set_default_color_theme("blue")
@@ -475,6 +940,13 @@ class App(ctk.CTk):
         ctk.CTkSwitch(p, text="保存历史记录", variable=self.v_hist, progress_color=COLOR_GREEN, font=FONT_MAIN).pack(fill="x", padx=10, pady=5)
         self.v_log = ctk.BooleanVar(value=self.cfg["enable_logging"])
         ctk.CTkSwitch(p, text="开启调试日志", variable=self.v_log, progress_color=COLOR_GREEN, font=FONT_MAIN).pack(fill="x", padx=10, pady=5)
+        ctk.CTkButton(p, text="截图历史", height=32, font=FONT_MAIN, fg_color="#3a3a3c", hover_color="#48484a",
+                      command=self.open_history).pack(fill="x", padx=10, pady=5)
+
+        self.e_idle = self.mk_entry(p, str(self.cfg["idle_unload_min"]))
+        ctk.CTkLabel(p, text="^ 空闲释放模型 (分钟, 0=不释放)", font=FONT_SMALL, text_color="gray").pack(anchor="e", padx=10)
+        self.e_budget = self.mk_entry(p, str(self.cfg["memory_budget_mb"]))
+        ctk.CTkLabel(p, text="^ 内存预算 (MB, 0=不限)", font=FONT_SMALL, text_color="gray").pack(anchor="e", padx=10)
 
         self.add_lbl("快捷键", p)
         self.v_hk_en = ctk.BooleanVar(value=self.cfg["enable_hotkeys"])
@@ -560,9 +1032,18 @@ class App(ctk.CTk):
         self.cfg["api_key"] = self.e_key.get()
         self.cfg["base_url"] = self.e_url.get()
         self.cfg["model"] = self.e_model.get()
+        invalid = False
+        for key, entry in (("idle_unload_min", self.e_idle), ("memory_budget_mb", self.e_budget)):
+            val = Config.to_int(entry.get().strip(), None)
+            if val is None: invalid = True
+            else: self.cfg[key] = val
+            # 输入无效时还原为当前值
+            entry.delete(0, "end")
+            entry.insert(0, str(self.cfg[key]))
         Config.save(self.cfg)
         self.reload_config(self.cfg)
         self.toggle_settings_drawer()
+        if invalid: self.show_status("Invalid Number", COLOR_RED)
 
     def apply_topmost(self):
         self.attributes("-topmost", self.cfg["always_on_top"])
@@ -585,6 +1066,8 @@ class App(ctk.CTk):
 
     def setup_tray(self):
         def on_exit(icon, item):
+            self.lifecycle.stop()
+            self.store.flush()
             icon.stop()
             self.quit()
         def on_show(icon, item):
@@ -602,6 +1085,7 @@ class App(ctk.CTk):
             item('显示主界面', on_show),
             item('截图 (Snip)', lambda i,m: self.after(0, self.start_snip)),
             item('识字 (Clip)', lambda i,m: self.after(0, self.start_clipboard_ocr)),
+            item('截图历史', lambda i,m: self.after(0, self.open_history)),
             item('退出', on_exit)
         )
         self.tray = pystray.Icon("ImageTt", image, "ImageTt", menu)
@@ -617,11 +1101,21 @@ class App(ctk.CTk):
         self.cfg["use_ai"] = self.ai_var.get()
         Config.save(self.cfg)
 
+    def open_history(self):
+        if self.history and self.history.winfo_exists():
+            self.history.refresh()
+            self.history.deiconify()
+            self.history.focus_force()
+            return
+        self.history = HistoryWindow(self)
+
     def start_snip(self):
+        self.engine.prewarm()
         self.withdraw()
         self.after(200, lambda: SnippingTool(self))
 
     def start_clipboard_ocr(self):
+        self.engine.prewarm()
         try: img = ImageGrab.grabclipboard()
         except: 
             self.show_status("Clip Error", COLOR_RED)
@@ -640,10 +1134,8 @@ class App(ctk.CTk):
         self.deiconify()
         self.attributes("-topmost", True)
         if action == "save":
-            ts = datetime.now().strftime("%Y%m%d_%H%M%S")
-            path = os.path.join(Config.SCREENSHOT_DIR, f"{ts}.png")
-            img.save(path)
-            self.show_status(f"Saved", COLOR_GREEN)
+            self.show_status("Saving...", "white")
+            threading.Thread(target=self._save_thread, args=(img,), daemon=True).start()
         elif action == "pin":
             PinWindow(self, img) # 传递 self 给 PinWindow
             self.show_status("Pinned", COLOR_BLUE)
@@ -651,6 +1143,15 @@ class App(ctk.CTk):
             self.show_status("Identifying...", "white")
             threading.Thread(target=self._ocr_thread, args=(img,)).start()
 
+    def _save_thread(self, img):
+        try: _, is_new = self.store.add(img, "snip")
+        except Exception as e:
+            print(f"Save Error: {e}")
+            self.after(0, lambda: self.show_status("Save Failed", COLOR_RED))
+            return
+        if is_new: self.after(0, lambda: self.show_status("Saved", COLOR_GREEN))
+        else: self.after(0, lambda: self.show_status("Duplicate", COLOR_BLUE))
+
     def _ocr_thread(self, img):
         text = self.engine.run_ocr(img)
         if text:
@@ -659,6 +1160,7 @@ class App(ctk.CTk):
                 text = self.engine.run_ai(text, self.cfg)
             pyperclip.copy(text)
             HistoryManager.save(text, self.cfg["enable_history"])
+            self.store.link_text(img, text)
             self.after(0, lambda: self.update_preview_text(text))
             self.after(0, lambda: self.show_status("Copied!", COLOR_GREEN))
         else:
@@ -666,7 +1168,7 @@ class App(ctk.CTk):
 
     def show_status(self, text, color):
         self.lbl_status.configure(text=text, text_color=color)
-        if text not in ["Ready", "Identifying...", "AI Fixing..."]: 
+        if text not in ["Ready", "Identifying...", "AI Fixing...", "Saving..."]: 
             self.after(3000, lambda: self.lbl_status.configure(text="Ready", text_color="gray"))
 
     # 公共方法供 PinWindow 使用